@@ -14,6 +14,9 @@ setup(name='tap-crossbeam',
           'singer-python>5'
       ],
       extras_require={
+          'async': [
+              'aiohttp>3',
+          ],
           'test': [
               'pylint',
               'nose',
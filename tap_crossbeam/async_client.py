@@ -0,0 +1,170 @@
+import asyncio
+import collections
+import time
+
+import aiohttp
+import backoff
+import singer
+from singer import metrics
+
+from tap_crossbeam.client import BaseCrossbeamClient, Server5xxError
+
+LOGGER = singer.get_logger()
+
+MAX_TRIES = 5
+RETRYABLE_EXCEPTIONS = (Server5xxError,
+                        aiohttp.ClientConnectionError,
+                        asyncio.TimeoutError)
+
+
+class AsyncRateLimiter():
+    """Sliding window limiter; waits instead of raising once `calls` requests
+    have been made in the last `period` seconds."""
+
+    def __init__(self, calls, period):
+        self.__calls = calls
+        self.__period = period
+        self.__timestamps = collections.deque()
+        self.__lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.__lock:
+            while True:
+                now = time.monotonic()
+                while self.__timestamps and now - self.__timestamps[0] >= self.__period:
+                    self.__timestamps.popleft()
+                if len(self.__timestamps) < self.__calls:
+                    self.__timestamps.append(now)
+                    return
+                await asyncio.sleep(self.__period - (now - self.__timestamps[0]))
+
+
+class AsyncCrossbeamClient(BaseCrossbeamClient):
+    DEFAULT_MAX_CONCURRENT_REQUESTS = 20
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.__max_concurrent_requests = int(config.get('max_concurrent_requests',
+                                                        self.DEFAULT_MAX_CONCURRENT_REQUESTS))
+        if self.__max_concurrent_requests < 1:
+            raise Exception('max_concurrent_requests must be at least 1, got '
+                            f'{self.__max_concurrent_requests}')
+        self.__session = None
+        self.__auth_lock = None
+        self.__rate_limiter = None
+        self.__request_semaphore = None
+
+    async def __aenter__(self):
+        # Created here rather than in __init__ so they bind to the running loop
+        self.__session = aiohttp.ClientSession()
+        self.__auth_lock = asyncio.Lock()
+        self.__rate_limiter = AsyncRateLimiter(calls=300, period=60)
+        # Held only around the HTTP call itself, so nested syncs waiting on
+        # their children never hold a slot and cannot deadlock.
+        self.__request_semaphore = asyncio.Semaphore(self.__max_concurrent_requests)
+        return self
+
+    async def __aexit__(self, exit_type, value, traceback):
+        await self.__session.close()
+
+    async def refresh_access_token(self):
+        data = await self.request('POST', **self._refresh_access_token_kwargs())
+        self._set_access_token(data)
+
+    async def _ensure_access_token(self):
+        # Many requests can start before the first token arrives; only one of
+        # them should hit the auth server.
+        async with self.__auth_lock:
+            if self._needs_access_token(skip_auth=False):
+                await self.refresh_access_token()
+
+    async def request(self, method, **kwargs):
+        # backoff's own coroutine support relies on asyncio.coroutine, which
+        # is gone in newer Pythons, so the retry loop is done by hand with the
+        # same wait generator and jitter the sync client uses (3/6/12/24s).
+        wait_gen = backoff.expo(factor=3)
+        tries = 0
+        while True:
+            tries += 1
+            try:
+                return await self._request(method, **kwargs)
+            except RETRYABLE_EXCEPTIONS as exc:
+                if tries >= MAX_TRIES:
+                    raise
+                wait = backoff.full_jitter(next(wait_gen))
+                LOGGER.info('Backing off %.1f seconds after %s', wait, type(exc).__name__)
+                await asyncio.sleep(wait)
+
+    async def _request(self,
+                       method,
+                       path=None,
+                       url=None,
+                       skip_auth=False,
+                       **kwargs):
+        if self._needs_access_token(skip_auth):
+            await self._ensure_access_token()
+
+        url, endpoint = self._prepare_request(path, url, skip_auth, kwargs)
+
+        if not self.verify_ssl_certs:
+            kwargs['ssl'] = False
+
+        if kwargs.get('params') is None:
+            kwargs.pop('params', None)
+
+        async with self.__request_semaphore:
+            # Take the rate limit slot only once the request can actually be
+            # sent, so the window counts sends rather than queued requests.
+            await self.__rate_limiter.acquire()
+            with metrics.http_request_timer(endpoint) as timer:
+                async with self.__session.request(method, url, **kwargs) as response:
+                    timer.tags[metrics.Tag.http_status_code] = response.status
+
+                    if response.status >= 500:
+                        raise Server5xxError()
+
+                    response.raise_for_status()
+
+                    return await response.json()
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path=path, **kwargs)
+
+    async def _yield_helper(self, path, endpoint, *, items_key='items'):
+        next_href = None
+        while path or next_href:
+            LOGGER.debug('%s - Fetching %s', endpoint, path or next_href)
+            data = await self.get(path, url=next_href, endpoint=endpoint)
+            for item in data[items_key]:
+                yield item
+            path = None
+            next_href = data.get('pagination', {}).get('next_href')
+
+    async def yield_sources(self):
+        async for item in self._yield_helper('/v0.1/sources', 'sources'):
+            yield item
+
+    async def yield_receiving_data_shares(self):
+        async for item in self._yield_helper('/v0.1/data-shares', 'data_shares',
+                                             items_key='receiving_data_shares'):
+            yield item
+
+    async def yield_partner_shared_fields(self):
+        # See CrossbeamClient.yield_partner_shared_fields
+        async for data_share in self.yield_receiving_data_shares():
+            for shared_field in data_share['shared_fields']:
+                yield shared_field
+
+    async def yield_records(self):
+        async for item in self._yield_helper('/v0.1/records?limit=1000', 'records'):
+            yield item
+
+    async def yield_partner_records(self):
+        async for item in self._yield_helper('/v0.1/partner-records?limit=1000',
+                                             'partner_records'):
+            yield item
+
+    async def yield_partners(self):
+        async for item in self._yield_helper('/v0.1/partners', 'partners',
+                                             items_key='partner_orgs'):
+            yield item
@@ -10,7 +10,9 @@ LOGGER = singer.get_logger()
 class Server5xxError(Exception):
     pass
 # pylint: disable=too-many-instance-attributes
-class CrossbeamClient():
+class BaseCrossbeamClient():
+    """Config, auth and header handling shared by the sync and async
+    clients."""
     DEFAULT_BASE_URL = 'https://api.crossbeam.com'
     DEFAULT_AUTH_BASE_URL = 'https://auth.crossbeam.com'
 
@@ -25,29 +27,67 @@ class CrossbeamClient():
         self.__verify_ssl_certs = config.get('verify_ssl_certs', True)
         self.__default_headers = {'X-Requested-With': 'stitch'}
 
-        self.__session = requests.Session()
         self.__access_token = None
 
-    def __enter__(self):
-        return self
+    @property
+    def verify_ssl_certs(self):
+        return self.__verify_ssl_certs
 
-    def __exit__(self, exit_type, value, traceback):
-        self.__session.close()
+    def _needs_access_token(self, skip_auth):
+        return not skip_auth and not self.__access_token
 
-    def refresh_access_token(self):
-        data = self.request(
-            'POST',
-            url=f'{self.__auth_base_url}/oauth/token',
-            data={
+    def _refresh_access_token_kwargs(self):
+        return {
+            'url': f'{self.__auth_base_url}/oauth/token',
+            'data': {
                 'client_id': self.__client_id,
                 'client_secret': self.__client_secret,
                 'refresh_token': self.__refresh_token,
                 'grant_type': 'refresh_token'
             },
-            skip_auth=True)
+            'skip_auth': True,
+        }
 
+    def _set_access_token(self, data):
         self.__access_token = data['access_token']
 
+    def _prepare_request(self, path, url, skip_auth, kwargs):
+        """Adds the default and auth headers to kwargs in place, removes the
+        metrics `endpoint` tag from it, and returns (url, endpoint)."""
+        kwargs['headers'] = dict(kwargs.get('headers') or {})
+        for header, value in self.__default_headers.items():
+            kwargs['headers'][header] = value
+
+        if not skip_auth:
+            kwargs['headers']['Authorization'] = f'Bearer {self.__access_token}'
+            kwargs['headers']['Xbeam-Organization'] = self.__organization_uuid
+
+        endpoint = kwargs.pop('endpoint', None)
+
+        if self.__user_agent:
+            kwargs['headers']['User-Agent'] = self.__user_agent
+
+        if not url:
+            url = self.__base_url + path
+
+        return url, endpoint
+
+
+class CrossbeamClient(BaseCrossbeamClient):
+    def __init__(self, config):
+        super().__init__(config)
+        self.__session = requests.Session()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exit_type, value, traceback):
+        self.__session.close()
+
+    def refresh_access_token(self):
+        data = self.request('POST', **self._refresh_access_token_kwargs())
+        self._set_access_token(data)
+
     @backoff.on_exception(backoff.expo,
                           (Server5xxError,
                            RateLimitException,
@@ -63,30 +103,12 @@ class CrossbeamClient():
                 url=None,
                 skip_auth=False,
                 **kwargs):
-        if 'headers' not in kwargs:
-            kwargs['headers'] = {}
-        for header, value in self.__default_headers.items():
-            kwargs['headers'][header] = value
-
-        if not skip_auth:
-            if not self.__access_token:
-                self.refresh_access_token()
-            kwargs['headers']['Authorization'] = f'Bearer {self.__access_token}'
-            kwargs['headers']['Xbeam-Organization'] = self.__organization_uuid
+        if self._needs_access_token(skip_auth):
+            self.refresh_access_token()
 
-        if 'endpoint' in kwargs:
-            endpoint = kwargs['endpoint']
-            del kwargs['endpoint']
-        else:
-            endpoint = None
+        url, endpoint = self._prepare_request(path, url, skip_auth, kwargs)
 
-        if self.__user_agent:
-            kwargs['headers']['User-Agent'] = self.__user_agent
-
-        kwargs['verify'] = self.__verify_ssl_certs
-
-        if not url:
-            url = self.__base_url + path
+        kwargs['verify'] = self.verify_ssl_certs
 
         with metrics.http_request_timer(endpoint) as timer:
             response = self.__session.request(method, url, **kwargs)
@@ -1,6 +1,7 @@
 import os
 import re
 import json
+import functools
 
 from singer.catalog import Catalog, CatalogEntry, Schema
 
@@ -65,6 +66,9 @@ def _field_jschema_type(field):
     return ('string', None)
 
 
+# Called for every field of every record during sync, over a small and
+# stable set of display names
+@functools.lru_cache(maxsize=None)
 def normalize_name(name):
     return re.sub(r'[^a-z0-9\_]', '_', name.lower())
 
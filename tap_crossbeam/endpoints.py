@@ -22,7 +22,11 @@ ENDPOINTS_CONFIG = {
         'children': {
             'thread_timelines': {
                 'path': '/v0.1/threads/{thread_id}/timeline',
-                'pk': ['id']
+                'pk': ['id'],
+                # Only used with the skip_unchanged_children config flag: a
+                # thread's timeline is then re-fetched only when the thread
+                # itself or its latest comment is newer than the bookmark
+                'parent_replication_keys': ['updated_at', 'last_comment_at']
             }
         }
     }
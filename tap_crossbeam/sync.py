@@ -1,3 +1,5 @@
+import asyncio
+
 import singer
 from singer import metrics, metadata, Transformer
 import singer.bookmarks as books
@@ -39,6 +41,77 @@ def _child_key_bag(key_bag, endpoint, record):
     return child_key_bag
 
 
+def _parents_to_sync(state, child_stream_name, child_endpoint, records, child_bookmarks):
+    """Returns the parent records whose child stream should be fetched. When
+    the child declares `parent_replication_keys`, a parent is skipped only if
+    every one of those fields it has is older than the child's bookmark for
+    that field. The newest value seen per field is kept in child_bookmarks."""
+    replication_keys = child_endpoint.get('parent_replication_keys')
+    if not replication_keys:
+        return records
+    bookmarks = {key: books.get_bookmark(state, child_stream_name, key, '')
+                 for key in replication_keys}
+    max_values = child_bookmarks.setdefault(child_stream_name, bookmarks.copy())
+    parents = []
+    for record in records:
+        values = {key: record.get(key) for key in replication_keys}
+        present = {key: value for key, value in values.items() if value is not None}
+        if not present or any(value >= bookmarks[key] for key, value in present.items()):
+            parents.append(record)
+        for key, value in present.items():
+            if value > max_values[key]:
+                max_values[key] = value
+    if len(parents) < len(records):
+        LOGGER.info('%s - Skipping %s of %s parent records unchanged since %s',
+                    child_stream_name, len(records) - len(parents), len(records), bookmarks)
+    return parents
+
+
+def _write_child_bookmarks(state, child_bookmarks):
+    # Parents are not ordered by their replication keys, so the bookmarks can
+    # only move once every page of the parent has been read.
+    if not child_bookmarks:
+        return
+    for child_stream_name, max_values in child_bookmarks.items():
+        for replication_key, value in max_values.items():
+            books.write_bookmark(state, child_stream_name, replication_key, value)
+    singer.write_state(state)
+
+
+def _page_request_kwargs(stream_name, endpoint, path, url):
+    LOGGER.info('%s - Syncing: %s', stream_name, path or url)
+    params = None
+    if path and not url:
+        params = endpoint.get('params', {})
+    return {'path': path, 'url': url, 'params': params, 'endpoint': stream_name}
+
+
+def _process_page(state,
+                  required_streams,
+                  selected_streams,
+                  stream_name,
+                  endpoint,
+                  key_bag,
+                  schema,
+                  records,
+                  child_bookmarks):
+    """Writes a page of records and returns the child syncs it needs, as
+    (child_stream_name, child_endpoint, child_key_bag) tuples."""
+    if stream_name in selected_streams:
+        _write_records_and_metrics(stream_name, schema, [
+            {**record, **key_bag} for record in records])
+    children = []
+    for child_stream_name, child_endpoint in endpoint.get('children', {}).items():
+        if child_stream_name not in required_streams:
+            continue
+        for record in _parents_to_sync(state, child_stream_name, child_endpoint,
+                                       records, child_bookmarks):
+            children.append((child_stream_name,
+                             child_endpoint,
+                             _child_key_bag(key_bag, endpoint, record)))
+    return children
+
+
 def sync_endpoint(client,
                   catalog,
                   state,
@@ -47,36 +120,84 @@ def sync_endpoint(client,
                   stream_name,
                   endpoint,
                   key_bag):
-    stream = catalog.get_stream(stream_name)
-    schema = write_schema(stream)
+    schema = write_schema(catalog.get_stream(stream_name))
     url = None
     path = endpoint['path'].format(**key_bag)
+    child_bookmarks = {}
     while path or url:
-        LOGGER.info('%s - Syncing: %s', stream_name, path or url)
-        params = None
-        if path and not url:
-            params = endpoint.get('params', {})
-        data = client.request('GET', path=path, url=url, params=params, endpoint=stream_name)
+        data = client.request('GET', **_page_request_kwargs(stream_name, endpoint, path, url))
         records = data.get(endpoint.get('data_key', 'items'))
         if not records:
-            return
-        if stream_name in selected_streams:
-            _write_records_and_metrics(stream_name, schema, [
-                {**record, **key_bag} for record in records])
-        for child_stream_name, child_endpoint in endpoint.get('children', {}).items():
-            if child_stream_name not in required_streams:
-                continue
-            for record in records:
-                sync_endpoint(client,
+            break
+        children = _process_page(state, required_streams, selected_streams, stream_name,
+                                 endpoint, key_bag, schema, records, child_bookmarks)
+        for child_stream_name, child_endpoint, child_key_bag in children:
+            sync_endpoint(client, catalog, state, required_streams, selected_streams,
+                          child_stream_name, child_endpoint, child_key_bag)
+        url = nested_get(data, ['pagination', 'next_href'])
+        path = None
+    _write_child_bookmarks(state, child_bookmarks)
+
+
+async def sync_endpoint_async(client,
                               catalog,
                               state,
                               required_streams,
                               selected_streams,
-                              child_stream_name,
-                              child_endpoint,
-                              _child_key_bag(key_bag, endpoint, record))
+                              stream_name,
+                              endpoint,
+                              key_bag):
+    """Same as sync_endpoint, but the child syncs of a page run concurrently.
+    The client caps how many of their requests are in flight at once."""
+    schema = write_schema(catalog.get_stream(stream_name))
+    url = None
+    path = endpoint['path'].format(**key_bag)
+    child_bookmarks = {}
+    while path or url:
+        data = await client.request('GET',
+                                    **_page_request_kwargs(stream_name, endpoint, path, url))
+        records = data.get(endpoint.get('data_key', 'items'))
+        if not records:
+            break
+        children = _process_page(state, required_streams, selected_streams, stream_name,
+                                 endpoint, key_bag, schema, records, child_bookmarks)
+        await asyncio.gather(*[
+            sync_endpoint_async(client, catalog, state, required_streams, selected_streams,
+                                child_stream_name, child_endpoint, child_key_bag)
+            for child_stream_name, child_endpoint, child_key_bag in children])
         url = nested_get(data, ['pagination', 'next_href'])
         path = None
+    _write_child_bookmarks(state, child_bookmarks)
+
+
+async def sync_endpoints_async(config,
+                               catalog,
+                               state,
+                               required_streams,
+                               selected_streams,
+                               endpoint_streams):
+    # aiohttp is an optional dependency and roughly doubles the import time
+    # of the tap, so only load it for runs that use the async client.
+    # tests/unittests/test_startup.py guards this.
+    try:
+        # pylint: disable=import-outside-toplevel
+        from tap_crossbeam.async_client import AsyncCrossbeamClient
+    except ImportError as exc:
+        if exc.name != 'aiohttp':
+            raise
+        raise Exception('async_requests requires aiohttp, '
+                        'install tap-crossbeam[async]') from exc
+    async with AsyncCrossbeamClient(config) as client:
+        for stream_name, endpoint in endpoint_streams:
+            update_current_stream(state, stream_name)
+            await sync_endpoint_async(client,
+                                      catalog,
+                                      state,
+                                      required_streams,
+                                      selected_streams,
+                                      stream_name,
+                                      endpoint,
+                                      {})
 
 
 def update_current_stream(state, stream_name=None):
@@ -84,6 +205,19 @@ def update_current_stream(state, stream_name=None):
     singer.write_state(state)
 
 
+def _without_parent_replication_keys(endpoints):
+    """Returns a copy of endpoints without any `parent_replication_keys`, so
+    child streams are fetched for every parent record."""
+    stripped = {}
+    for name, endpoint in endpoints.items():
+        endpoint = {key: value for key, value in endpoint.items()
+                    if key != 'parent_replication_keys'}
+        if 'children' in endpoint:
+            endpoint['children'] = _without_parent_replication_keys(endpoint['children'])
+        stripped[name] = endpoint
+    return stripped
+
+
 def get_required_streams(endpoints, selected_stream_names):
     required_streams = []
     for name, endpoint in endpoints.items():
@@ -125,16 +259,20 @@ def _stream_lookup(catalog):
     return lookup
 
 
-def _write_owner(raw_record, user_mdmeta, master_key):
-    record = {}
-    for display_name, value in raw_record[master_key]['owner'].items():
-        record[normalize_name(display_name)] = value
-    for field in STANDARD_KEYS[user_mdmeta['stream'].stream]:
-        record[field] = raw_record[field[1:]]
-    with Transformer() as transformer:
-        record_typed = transformer.transform(
-            record, user_mdmeta['schema'], user_mdmeta['metadata'])
-        singer.write_record(user_mdmeta['stream'].stream, record_typed)
+def _build_record(fields, stream_name, standard_values):
+    record = {normalize_name(display_name): value
+              for display_name, value in fields.items()}
+    for field in STANDARD_KEYS[stream_name]:
+        record[field] = standard_values[field[1:]]
+    return record
+
+
+def _write_owner(transformer, raw_record, user_mdmeta, master_key):
+    stream_name = user_mdmeta['stream'].stream
+    record = _build_record(raw_record[master_key]['owner'], stream_name, raw_record)
+    record_typed = transformer.transform(
+        record, user_mdmeta['schema'], user_mdmeta['metadata'])
+    singer.write_record(stream_name, record_typed)
 
 
 def sync_partner_records(client, catalog, required_streams, state):
@@ -148,36 +286,34 @@ def sync_partner_records(client, catalog, required_streams, state):
     user_mdmeta = _stream_to_meta_and_stream(user_stream) if user_stream else None
     max_overlap_time = ''
     book_overlap_time = books.get_bookmark(state, 'partner_records', 'overlap_time', '')
-    for raw_record in client.yield_partner_records():
-        overlap_time = raw_record['overlap_time'] or ''
-        if overlap_time and overlap_time < book_overlap_time:
-            continue
-        max_overlap_time = overlap_time if overlap_time > max_overlap_time else max_overlap_time
-        if 'mdm_type' in raw_record:
-            # FIXME remove once route is updated
-            raw_record['partner_mdm_type'] = raw_record['mdm_type']
-        mdmeta = stream_lookup['partner_' + raw_record['partner_mdm_type']]
-        stream_name = mdmeta['stream'].stream
-        if stream_name not in required_streams:
-            continue
-        augmented_rec = {
-            'population_ids': [x['id'] for x in raw_record['populations']],
-            'population_names': [x['name'] for x in raw_record['populations']],
-            'partner_name': partner_lookup[raw_record['partner_organization_id']],
-            'partner_population_ids': [x['id'] for x in raw_record['partner_populations']],
-            'partner_population_names': [x['name'] for x in raw_record['partner_populations']],
-            **raw_record,
-        }
-        record = {}
-        for display_name, value in augmented_rec['partner_master']['top_level'].items():
-            record[normalize_name(display_name)] = value
-        for field in STANDARD_KEYS[stream_name]:
-            record[field] = augmented_rec[field[1:]]
-        with Transformer() as transformer:
+    with Transformer() as transformer:
+        for raw_record in client.yield_partner_records():
+            overlap_time = raw_record['overlap_time'] or ''
+            if overlap_time and overlap_time < book_overlap_time:
+                continue
+            max_overlap_time = overlap_time if overlap_time > max_overlap_time else max_overlap_time
+            if 'mdm_type' in raw_record:
+                # FIXME remove once route is updated
+                raw_record['partner_mdm_type'] = raw_record['mdm_type']
+            mdmeta = stream_lookup['partner_' + raw_record['partner_mdm_type']]
+            stream_name = mdmeta['stream'].stream
+            if stream_name not in required_streams:
+                continue
+            augmented_rec = {
+                'population_ids': [x['id'] for x in raw_record['populations']],
+                'population_names': [x['name'] for x in raw_record['populations']],
+                'partner_name': partner_lookup[raw_record['partner_organization_id']],
+                'partner_population_ids': [x['id'] for x in raw_record['partner_populations']],
+                'partner_population_names': [x['name'] for x in raw_record['partner_populations']],
+                **raw_record,
+            }
+            record = _build_record(augmented_rec['partner_master']['top_level'],
+                                   stream_name,
+                                   augmented_rec)
             record_typed = transformer.transform(record, mdmeta['schema'], mdmeta['metadata'])
             singer.write_record(stream_name, record_typed)
-        if user_mdmeta and 'owner' in raw_record['partner_master']:
-            _write_owner(raw_record, user_mdmeta, 'partner_master')
+            if user_mdmeta and 'owner' in raw_record['partner_master']:
+                _write_owner(transformer, raw_record, user_mdmeta, 'partner_master')
     books.write_bookmark(state, 'partner_records', 'overlap_time', max_overlap_time)
     singer.write_state(state)
 
@@ -192,31 +328,27 @@ def sync_records(client, catalog, required_streams, state):
     stream_lookup = _stream_lookup(catalog)
     max_updated_at = ''
     book_updated_at = books.get_bookmark(state, 'records', 'updated_at', '')
-    for raw_record in client.yield_records():
-        updated_at = raw_record['updated_at']
-        if updated_at < book_updated_at:
-            continue
-        max_updated_at = updated_at if updated_at > max_updated_at else max_updated_at
-        source = source_lookup[raw_record['source_id']]
-        mdmeta = stream_lookup[source['mdm_type']]
-        stream_name = mdmeta['stream'].stream
-        if stream_name not in required_streams:
-            continue
-        record = {}
-        for display_name, value in raw_record['master']['top_level'].items():
-            record[normalize_name(display_name)] = value
-        for field in STANDARD_KEYS[stream_name]:
-            record[field] = raw_record[field[1:]]
-        with Transformer() as transformer:
+    with Transformer() as transformer:
+        for raw_record in client.yield_records():
+            updated_at = raw_record['updated_at']
+            if updated_at < book_updated_at:
+                continue
+            max_updated_at = updated_at if updated_at > max_updated_at else max_updated_at
+            source = source_lookup[raw_record['source_id']]
+            mdmeta = stream_lookup[source['mdm_type']]
+            stream_name = mdmeta['stream'].stream
+            if stream_name not in required_streams:
+                continue
+            record = _build_record(raw_record['master']['top_level'], stream_name, raw_record)
             record_typed = transformer.transform(record, mdmeta['schema'], mdmeta['metadata'])
             singer.write_record(stream_name, record_typed)
-        if user_mdmeta and 'owner' in raw_record['master']:
-            _write_owner(raw_record, user_mdmeta, 'master')
+            if user_mdmeta and 'owner' in raw_record['master']:
+                _write_owner(transformer, raw_record, user_mdmeta, 'master')
     books.write_bookmark(state, 'records', 'updated_at', max_updated_at)
     singer.write_state(state)
 
 
-def sync(client, _, catalog, state):
+def sync(client, config, catalog, state):
     if catalog:
         selected_streams = catalog.get_selected_streams(state)
     else:
@@ -226,14 +358,28 @@ def sync(client, _, catalog, state):
     selected_stream_names = []
     for selected_stream in sorted(selected_streams, key=lambda s: s.tap_stream_id):
         selected_stream_names.append(selected_stream.tap_stream_id)
-    required_endpoint_streams = get_required_streams(ENDPOINTS_CONFIG, selected_stream_names)
-    for stream_name, endpoint in ENDPOINTS_CONFIG.items():
+    endpoints = ENDPOINTS_CONFIG
+    if not config.get('skip_unchanged_children'):
+        endpoints = _without_parent_replication_keys(endpoints)
+    required_endpoint_streams = get_required_streams(endpoints, selected_stream_names)
+    endpoint_streams = []
+    for stream_name, endpoint in endpoints.items():
         if currently_syncing:
             if currently_syncing == stream_name:
                 currently_syncing = None
             else:
                 continue
         if stream_name in required_endpoint_streams:
+            endpoint_streams.append((stream_name, endpoint))
+    if config.get('async_requests'):
+        asyncio.run(sync_endpoints_async(config,
+                                         catalog,
+                                         state,
+                                         required_endpoint_streams,
+                                         selected_stream_names,
+                                         endpoint_streams))
+    else:
+        for stream_name, endpoint in endpoint_streams:
             update_current_stream(state, stream_name)
             sync_endpoint(client,
                           catalog,
@@ -0,0 +1,73 @@
+"""Measures how long `import tap_crossbeam` takes in a fresh interpreter.
+
+    python tests/benchmarks/bench_startup.py [--runs N] [--top N] [--budget-ms MS]
+
+Reports two numbers, each the best of several runs:
+
+- The wall time of `python -c 'import tap_crossbeam'` minus that of
+  `python -c pass`.
+- The cumulative import time of tap_crossbeam, from `python -X importtime`.
+
+It also lists the slowest imports. With --budget-ms it exits non-zero when
+the cumulative import time is over budget. The interpreters run from the
+repository root, so this checkout is what gets imported and the package does
+not need to be installed."""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def wall_time(code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def import_times():
+    """Returns {module: (self_us, cumulative_us)} for one
+    `python -X importtime -c 'import tap_crossbeam'` run."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import tap_crossbeam'],
+                            cwd=REPO_ROOT, check=True, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float)
+    args = parser.parse_args()
+
+    interpreter = min(wall_time('pass') for _ in range(args.runs))
+    tap = min(wall_time('import tap_crossbeam') for _ in range(args.runs))
+    runs = [import_times() for _ in range(args.runs)]
+    best = min(runs, key=lambda times: times['tap_crossbeam'][1])
+    cumulative_ms = best['tap_crossbeam'][1] / 1000
+
+    print(f'best of {args.runs}')
+    print(f'python -c pass:                   {interpreter * 1000:7.1f} ms')
+    print(f'python -c "import tap_crossbeam": {tap * 1000:7.1f} ms '
+          f'(+{(tap - interpreter) * 1000:.1f} ms)')
+    print(f'-X importtime tap_crossbeam:      {cumulative_ms:7.1f} ms cumulative')
+    print('slowest imports (cumulative ms) in that run:')
+    slowest = sorted(best.items(), key=lambda item: item[1][1], reverse=True)
+    for module, (_, cumulative_us) in slowest[1:args.top + 1]:
+        print(f'  {cumulative_us / 1000:7.1f}  {module}')
+
+    if args.budget_ms is not None and cumulative_ms > args.budget_ms:
+        print(f'import time {cumulative_ms:.1f} ms is over the {args.budget_ms:.1f} ms budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Times sync_records on synthetic wide rows (5000 records x 60 columns by
+default). Two allocation measures are reported alongside the time: the
+garbage collections the run triggers, and the memory each record's
+intermediate objects take up while it is being processed.
+
+    PYTHONPATH=. python tests/benchmarks/bench_sync_records.py [--records N] [--columns N] [--runs N]
+
+Run it from the repository root (or after `pip install -e .`). Records are
+built before measuring and the Singer output goes to os.devnull, so the
+numbers cover only the record pipeline. CPython runs a generation-0
+collection each time container allocations (dicts, lists, ...) outnumber
+deallocations by the gc threshold. Objects freed straight away never
+trigger a collection, so the tracemalloc figure is the one that shows
+per-record intermediates. Run it on two commits to compare them."""
+import argparse
+import contextlib
+import gc
+import logging
+import os
+import time
+import tracemalloc
+
+from singer.catalog import Catalog, CatalogEntry, Schema
+
+from tap_crossbeam.discover import STANDARD_KEYS, normalize_name
+from tap_crossbeam.sync import sync_records
+
+
+class FakeClient():
+    def __init__(self, records, on_record=None):
+        self.__records = records
+        self.__on_record = on_record
+
+    def yield_sources(self):
+        yield {'id': 1, 'mdm_type': 'account'}
+
+    def yield_records(self):
+        for record in self.__records:
+            if self.__on_record:
+                self.__on_record()
+            yield record
+
+
+def build_catalog(display_names):
+    properties = dict(STANDARD_KEYS['account'])
+    for display_name in display_names:
+        properties[normalize_name(display_name)] = {'type': ['null', 'string']}
+    metadata = [{'breadcrumb': [], 'metadata': {}}]
+    for prop in properties:
+        metadata.append({'breadcrumb': ['properties', prop],
+                         'metadata': {'inclusion': 'available'}})
+    return Catalog([CatalogEntry(
+        stream='account',
+        tap_stream_id='account',
+        key_properties=['_crossbeam_id'],
+        schema=Schema.from_dict({'type': 'object', 'properties': properties}),
+        metadata=metadata)])
+
+
+def build_records(display_names, count):
+    return [{
+        'updated_at': '2024-01-01T00:00:00Z',
+        'source_id': 1,
+        'crossbeam_id': str(i),
+        'record_id': str(i),
+        'master': {'top_level': {name: f'value {i}' for name in display_names}},
+    } for i in range(count)]
+
+
+def collections():
+    return [generation['collections'] for generation in gc.get_stats()]
+
+
+def run(catalog, records):
+    """Returns the wall time of one sync_records run and the number of gc
+    collections per generation it triggered."""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+         contextlib.redirect_stdout(devnull):
+        gc.collect()
+        before = collections()
+        start = time.perf_counter()
+        sync_records(FakeClient(records), catalog, ['account'], {})
+        elapsed = time.perf_counter() - start
+        after = collections()
+    return elapsed, [a - b for a, b in zip(after, before)]
+
+
+def transient_bytes_per_record(catalog, records):
+    """Returns the mean of how far traced memory rose above its level at the
+    start of each record while that record was processed. That is roughly
+    the size of the intermediate objects one record goes through."""
+    rises = []
+    baseline = [None]
+
+    def on_record():
+        current, peak = tracemalloc.get_traced_memory()
+        if baseline[0] is not None:
+            rises.append(peak - baseline[0])
+        tracemalloc.reset_peak()
+        baseline[0] = current
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, \
+         contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        try:
+            sync_records(FakeClient(records, on_record), catalog, ['account'], {})
+        finally:
+            tracemalloc.stop()
+    return sum(rises) / len(rises)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--columns', type=int, default=60)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    # singer logs metrics at INFO, which would dominate the timings
+    logging.disable(logging.INFO)
+
+    display_names = [f'Field Name {i}' for i in range(args.columns)]
+    catalog = build_catalog(display_names)
+    records = build_records(display_names, args.records)
+
+    results = [run(catalog, records) for _ in range(args.runs)]
+    elapsed = min(result[0] for result in results)
+    gc_runs = min((result[1] for result in results), key=sum)
+    print(f'{args.records} records x {args.columns} columns, gc threshold {gc.get_threshold()}')
+    print(f'best of {args.runs}: {elapsed:.3f}s')
+    print('gc collections per generation: ' + ', '.join(str(count) for count in gc_runs))
+    print(f'gen 0 collections per 1000 records: {gc_runs[0] * 1000 / args.records:.1f}')
+    transient = transient_bytes_per_record(catalog, records)
+    print(f'transient traced bytes per record: {transient:.0f}')
+
+if __name__ == '__main__':
+    main()
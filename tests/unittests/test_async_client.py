@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import importlib
+import io
+import json
+import time
+import unittest
+from unittest import mock
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from singer.catalog import Catalog, CatalogEntry, Schema
+
+from tap_crossbeam.async_client import AsyncCrossbeamClient, AsyncRateLimiter
+from tap_crossbeam.client import CrossbeamClient, Server5xxError
+from tap_crossbeam.discover import get_pk, get_schemas
+
+# tap_crossbeam re-exports the sync() function under the module's name
+sync = importlib.import_module('tap_crossbeam.sync')
+
+THREADS_ENDPOINT = {
+    'path': '/v0.1/threads',
+    'pk': ['id'],
+    'provides': {'thread_id': ['id']},
+    'children': {
+        'thread_timelines': {
+            'path': '/v0.1/threads/{thread_id}/timeline',
+            'pk': ['id'],
+            'parent_replication_keys': ['updated_at', 'last_comment_at'],
+        },
+    },
+}
+THREAD_PAGES = [
+    [{'id': f't{i}', 'updated_at': f'2024-01-{i + 1:02d}T00:00:00Z'} for i in range(5)],
+    [{'id': 't5', 'updated_at': '2024-02-01T00:00:00Z',
+      'last_comment_at': '2024-02-15T00:00:00Z'}],
+]
+
+
+def build_catalog():
+    schemas, field_metadata = get_schemas()
+    return Catalog([
+        CatalogEntry(stream=stream_name,
+                     tap_stream_id=stream_name,
+                     key_properties=get_pk(stream_name),
+                     schema=Schema.from_dict(schemas[stream_name]),
+                     metadata=field_metadata[stream_name])
+        for stream_name in ['threads', 'thread_timelines']
+    ])
+
+
+class FakeCrossbeam():
+    """A local stand-in for the auth and API servers that records what the
+    clients asked for."""
+
+    def __init__(self, response_delay=0):
+        self.response_delay = response_delay
+        self.token_requests = 0
+        self.authorizations = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.app = web.Application()
+        self.app.router.add_post('/oauth/token', self.token)
+        self.app.router.add_get('/v0.1/threads', self.threads)
+        self.app.router.add_get('/v0.1/threads/{thread_id}/timeline', self.timeline)
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, exit_type, value, traceback):
+        await self.server.close()
+
+    @property
+    def config(self):
+        base_url = f'http://{self.server.host}:{self.server.port}'
+        return {
+            'organization_uuid': 'org',
+            'base_url': base_url,
+            'auth_base_url': base_url,
+        }
+
+    async def token(self, _request):
+        self.token_requests += 1
+        # Slow enough that concurrent first requests all see no token
+        await asyncio.sleep(0.05)
+        return web.json_response({'access_token': 'token'})
+
+    async def threads(self, request):
+        self.authorizations.append(request.headers.get('Authorization'))
+        page = int(request.query.get('page', 0))
+        next_href = None
+        if page + 1 < len(THREAD_PAGES):
+            next_href = str(request.url.with_query(page=page + 1))
+        return web.json_response({'items': THREAD_PAGES[page],
+                                  'pagination': {'next_href': next_href}})
+
+    async def timeline(self, request):
+        self.authorizations.append(request.headers.get('Authorization'))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.response_delay)
+        self.in_flight -= 1
+        thread_id = request.match_info['thread_id']
+        return web.json_response({'items': [{'id': f'{thread_id}-event'}],
+                                  'pagination': {}})
+
+
+def singer_messages(output):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+class TestAsyncRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_waits_for_the_window_to_reopen(self):
+        limiter = AsyncRateLimiter(calls=2, period=0.2)
+        start = time.monotonic()
+        await limiter.acquire()
+        await limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+        await limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+
+class TestRetries(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = AsyncCrossbeamClient({})
+        self.sleep = mock.AsyncMock()
+        patches = [
+            mock.patch('asyncio.sleep', self.sleep),
+            # Take jitter out so the waits are the exponential base values
+            mock.patch('backoff.full_jitter', side_effect=lambda value: value),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def test_retries_with_the_sync_clients_waits(self):
+        with mock.patch.object(self.client, '_request',
+                               side_effect=[Server5xxError(), Server5xxError(), {'ok': True}]):
+            self.assertEqual(await self.client.request('GET', path='/'), {'ok': True})
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [3, 6])
+
+    async def test_gives_up_after_five_tries(self):
+        with mock.patch.object(self.client, '_request', side_effect=Server5xxError()) as request:
+            with self.assertRaises(Server5xxError):
+                await self.client.request('GET', path='/')
+        self.assertEqual(request.call_count, 5)
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [3, 6, 12, 24])
+
+    async def test_other_errors_are_not_retried(self):
+        with mock.patch.object(self.client, '_request', side_effect=ValueError()) as request:
+            with self.assertRaises(ValueError):
+                await self.client.request('GET', path='/')
+        self.assertEqual(request.call_count, 1)
+        self.sleep.assert_not_called()
+
+
+class TestAsyncCrossbeamClient(unittest.IsolatedAsyncioTestCase):
+    def test_rejects_max_concurrent_requests_below_one(self):
+        with self.assertRaisesRegex(Exception, 'max_concurrent_requests'):
+            AsyncCrossbeamClient({'max_concurrent_requests': 0})
+
+    async def test_concurrent_first_requests_refresh_the_token_once(self):
+        async with FakeCrossbeam() as server:
+            async with AsyncCrossbeamClient(server.config) as client:
+                await asyncio.gather(*[client.get('/v0.1/threads') for _ in range(10)])
+        self.assertEqual(server.token_requests, 1)
+        self.assertEqual(server.authorizations, ['Bearer token'] * 10)
+
+    async def test_caps_requests_in_flight(self):
+        async with FakeCrossbeam(response_delay=0.05) as server:
+            config = {**server.config, 'max_concurrent_requests': 2}
+            async with AsyncCrossbeamClient(config) as client:
+                await asyncio.gather(*[client.get(f'/v0.1/threads/t{i}/timeline')
+                                       for i in range(6)])
+        self.assertEqual(server.max_in_flight, 2)
+
+    async def test_sync_endpoint_async_matches_sync_endpoint(self):
+        async with FakeCrossbeam(response_delay=0.01) as server:
+            def run_sync():
+                state = {}
+                output = io.StringIO()
+                with CrossbeamClient(server.config) as client, \
+                     contextlib.redirect_stdout(output):
+                    sync.sync_endpoint(client, build_catalog(), state,
+                                       ['threads', 'thread_timelines'],
+                                       ['threads', 'thread_timelines'],
+                                       'threads', THREADS_ENDPOINT, {})
+                return state, singer_messages(output)
+
+            sync_state, sync_messages = await asyncio.to_thread(run_sync)
+
+            async_state = {}
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                async with AsyncCrossbeamClient(server.config) as client:
+                    await sync.sync_endpoint_async(client, build_catalog(), async_state,
+                                                   ['threads', 'thread_timelines'],
+                                                   ['threads', 'thread_timelines'],
+                                                   'threads', THREADS_ENDPOINT, {})
+            async_messages = singer_messages(output)
+
+        def records(messages):
+            return sorted((message['stream'], message['record']['id'])
+                          for message in messages if message['type'] == 'RECORD')
+
+        self.assertEqual(len(records(sync_messages)), 12)
+        self.assertEqual(records(async_messages), records(sync_messages))
+        self.assertEqual(async_state, sync_state)
+        self.assertEqual(async_state['bookmarks']['thread_timelines'], {
+            'updated_at': '2024-02-01T00:00:00Z',
+            'last_comment_at': '2024-02-15T00:00:00Z',
+        })
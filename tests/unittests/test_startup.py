@@ -0,0 +1,46 @@
+import asyncio
+import importlib
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+
+def _modules_loaded_by_import():
+    """Imports tap_crossbeam in a fresh interpreter and returns the names of
+    every module that import left loaded."""
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        'import sys, tap_crossbeam; print("\\n".join(sys.modules))',
+    ])
+    return set(output.decode('utf-8').split())
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_does_not_load_async_client(self):
+        # aiohttp is optional and slow to import; only runs with
+        # async_requests set should pay for it.
+        modules = _modules_loaded_by_import()
+        self.assertIn('tap_crossbeam.sync', modules)
+        self.assertNotIn('tap_crossbeam.async_client', modules)
+        self.assertNotIn('aiohttp', modules)
+
+
+class TestAsyncImportErrors(unittest.TestCase):
+    def run_sync_endpoints_async(self):
+        sync = importlib.import_module('tap_crossbeam.sync')
+        asyncio.run(sync.sync_endpoints_async({}, None, {}, [], [], []))
+
+    def test_missing_aiohttp_names_the_extra(self):
+        # A None entry in sys.modules makes the import raise ImportError
+        with mock.patch.dict(sys.modules, {'aiohttp': None,
+                                           'tap_crossbeam.async_client': None}):
+            sys.modules.pop('tap_crossbeam.async_client')
+            with self.assertRaisesRegex(Exception, r'tap-crossbeam\[async\]'):
+                self.run_sync_endpoints_async()
+
+    def test_other_import_errors_are_not_hidden(self):
+        with mock.patch.dict(sys.modules, {'tap_crossbeam.async_client': None}):
+            with self.assertRaises(ImportError) as context:
+                self.run_sync_endpoints_async()
+        self.assertEqual(context.exception.name, 'tap_crossbeam.async_client')
@@ -0,0 +1,239 @@
+import contextlib
+import importlib
+import io
+import json
+import unittest
+
+from singer.catalog import Catalog, CatalogEntry, Schema
+
+from tap_crossbeam.discover import get_pk, get_schemas
+from tap_crossbeam.endpoints import ENDPOINTS_CONFIG
+
+# tap_crossbeam re-exports the sync() function under the module's name
+sync = importlib.import_module('tap_crossbeam.sync')
+
+TIMELINES_ENDPOINT = {
+    'path': '/v0.1/threads/{thread_id}/timeline',
+    'pk': ['id'],
+    'parent_replication_keys': ['updated_at', 'last_comment_at'],
+}
+THREADS_ENDPOINT = {
+    'path': '/v0.1/threads',
+    'pk': ['id'],
+    'provides': {'thread_id': ['id']},
+    'children': {'thread_timelines': TIMELINES_ENDPOINT},
+}
+
+
+def build_catalog():
+    schemas, field_metadata = get_schemas()
+    return Catalog([
+        CatalogEntry(stream=stream_name,
+                     tap_stream_id=stream_name,
+                     key_properties=get_pk(stream_name),
+                     schema=Schema.from_dict(schemas[stream_name]),
+                     metadata=field_metadata[stream_name])
+        for stream_name in ['threads', 'thread_timelines']
+    ])
+
+
+def threads_response(threads, next_href=None):
+    return {'items': threads, 'pagination': {'next_href': next_href}}
+
+
+class FakeClient():
+    """Serves pages of threads, then one timeline event per thread."""
+
+    def __init__(self, thread_pages, fail_on_page=None):
+        self.thread_pages = thread_pages
+        self.fail_on_page = fail_on_page
+        self.timeline_requests = []
+
+    def request(self, _method, path=None, url=None, **_kwargs):
+        if path and path.endswith('/timeline'):
+            thread_id = path.split('/')[3]
+            self.timeline_requests.append(thread_id)
+            return {'items': [{'id': f'{thread_id}-event'}], 'pagination': {}}
+        page = 0 if path else int(url.rsplit('=', 1)[1])
+        if page == self.fail_on_page:
+            raise RuntimeError('page failed')
+        return self.thread_pages[page]
+
+
+def run_sync_endpoint(client, state, endpoint=None):
+    """Runs sync_endpoint for threads and thread_timelines and returns the
+    Singer messages it wrote."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        sync.sync_endpoint(client,
+                           build_catalog(),
+                           state,
+                           ['threads', 'thread_timelines'],
+                           ['threads', 'thread_timelines'],
+                           'threads',
+                           endpoint or THREADS_ENDPOINT,
+                           {})
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+class TestParentsToSync(unittest.TestCase):
+    def parents_to_sync(self, state, records, child_bookmarks=None):
+        if child_bookmarks is None:
+            child_bookmarks = {}
+        parents = sync._parents_to_sync(state, 'thread_timelines', TIMELINES_ENDPOINT,
+                                        records, child_bookmarks)
+        return [parent['id'] for parent in parents], child_bookmarks
+
+    def test_without_replication_keys_every_parent_is_synced(self):
+        records = [{'id': 'a', 'updated_at': '2024-01-01'}, {'id': 'b'}]
+        child_bookmarks = {}
+        parents = sync._parents_to_sync({}, 'thread_timelines', {'pk': ['id']},
+                                        records, child_bookmarks)
+        self.assertEqual(parents, records)
+        self.assertEqual(child_bookmarks, {})
+
+    def test_without_bookmarks_every_parent_is_synced(self):
+        ids, child_bookmarks = self.parents_to_sync({}, [
+            {'id': 'a', 'updated_at': '2024-01-01'},
+            {'id': 'b', 'last_comment_at': '2024-02-01'},
+        ])
+        self.assertEqual(ids, ['a', 'b'])
+        self.assertEqual(child_bookmarks, {'thread_timelines': {
+            'updated_at': '2024-01-01',
+            'last_comment_at': '2024-02-01',
+        }})
+
+    def test_each_key_is_compared_with_its_own_bookmark(self):
+        state = {'bookmarks': {'thread_timelines': {
+            'updated_at': '2024-03-01',
+            'last_comment_at': '2024-01-01',
+        }}}
+        ids, _ = self.parents_to_sync(state, [
+            # updated_at is old, but there is a newer comment
+            {'id': 'comment', 'updated_at': '2024-02-01', 'last_comment_at': '2024-01-15'},
+            # last_comment_at is old, but the thread was updated
+            {'id': 'update', 'updated_at': '2024-03-02', 'last_comment_at': '2023-12-01'},
+            {'id': 'unchanged', 'updated_at': '2024-02-01', 'last_comment_at': '2023-12-01'},
+        ])
+        self.assertEqual(ids, ['comment', 'update'])
+
+    def test_value_equal_to_bookmark_is_synced(self):
+        state = {'bookmarks': {'thread_timelines': {
+            'updated_at': '2024-03-01',
+            'last_comment_at': '2024-03-01',
+        }}}
+        ids, _ = self.parents_to_sync(state, [
+            {'id': 'equal', 'updated_at': '2024-03-01'},
+            {'id': 'older', 'updated_at': '2024-02-28'},
+        ])
+        self.assertEqual(ids, ['equal'])
+
+    def test_parent_with_none_of_the_keys_is_synced(self):
+        state = {'bookmarks': {'thread_timelines': {
+            'updated_at': '2024-03-01',
+            'last_comment_at': '2024-03-01',
+        }}}
+        ids, _ = self.parents_to_sync(state, [
+            {'id': 'missing'},
+            {'id': 'null', 'updated_at': None, 'last_comment_at': None},
+        ])
+        self.assertEqual(ids, ['missing', 'null'])
+
+    def test_skipped_parents_still_advance_max_values(self):
+        state = {'bookmarks': {'thread_timelines': {'updated_at': '2024-03-01'}}}
+        _, child_bookmarks = self.parents_to_sync(state, [
+            {'id': 'a', 'updated_at': '2024-02-01', 'last_comment_at': '2024-01-01'},
+        ])
+        self.assertEqual(child_bookmarks, {'thread_timelines': {
+            'updated_at': '2024-03-01',
+            'last_comment_at': '2024-01-01',
+        }})
+
+    def test_max_values_carry_across_pages(self):
+        child_bookmarks = {}
+        self.parents_to_sync({}, [{'id': 'a', 'updated_at': '2024-05-01'}], child_bookmarks)
+        self.parents_to_sync({}, [{'id': 'b', 'updated_at': '2024-04-01'}], child_bookmarks)
+        self.assertEqual(child_bookmarks['thread_timelines']['updated_at'], '2024-05-01')
+
+
+class TestWriteChildBookmarks(unittest.TestCase):
+    def test_writes_every_key_and_state(self):
+        state = {}
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            sync._write_child_bookmarks(state, {'thread_timelines': {
+                'updated_at': '2024-05-01',
+                'last_comment_at': '2024-04-01',
+            }})
+        expected = {'bookmarks': {'thread_timelines': {
+            'updated_at': '2024-05-01',
+            'last_comment_at': '2024-04-01',
+        }}}
+        self.assertEqual(state, expected)
+        self.assertEqual(json.loads(output.getvalue()), {'type': 'STATE', 'value': expected})
+
+    def test_nothing_to_write(self):
+        state = {}
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            sync._write_child_bookmarks(state, {})
+        self.assertEqual(state, {})
+        self.assertEqual(output.getvalue(), '')
+
+
+class TestSyncEndpointBookmarks(unittest.TestCase):
+    PAGES = [
+        threads_response([{'id': 't1', 'updated_at': '2024-01-01T00:00:00Z'},
+                          {'id': 't2', 'updated_at': '2024-03-01T00:00:00Z'}],
+                         next_href='https://api.crossbeam.com/v0.1/threads?page=1'),
+        threads_response([{'id': 't3', 'updated_at': '2024-02-01T00:00:00Z',
+                           'last_comment_at': '2024-02-15T00:00:00Z'}]),
+    ]
+
+    def test_bookmarks_move_after_last_page(self):
+        state = {}
+        messages = run_sync_endpoint(FakeClient(self.PAGES), state)
+        self.assertEqual(state['bookmarks']['thread_timelines'], {
+            'updated_at': '2024-03-01T00:00:00Z',
+            'last_comment_at': '2024-02-15T00:00:00Z',
+        })
+        # One state message, written once the last page has been read
+        state_messages = [message for message in messages if message['type'] == 'STATE']
+        self.assertEqual(len(state_messages), 1)
+        self.assertEqual(messages[-1]['type'], 'STATE')
+
+    def test_bookmarks_do_not_move_when_a_later_page_fails(self):
+        state = {'bookmarks': {'thread_timelines': {'updated_at': '2023-01-01T00:00:00Z'}}}
+        with self.assertRaises(RuntimeError):
+            run_sync_endpoint(FakeClient(self.PAGES, fail_on_page=1), state)
+        self.assertEqual(state, {'bookmarks': {'thread_timelines': {
+            'updated_at': '2023-01-01T00:00:00Z'}}})
+
+    def test_second_run_skips_unchanged_threads(self):
+        state = {}
+        run_sync_endpoint(FakeClient(self.PAGES), state)
+        client = FakeClient(self.PAGES)
+        run_sync_endpoint(client, state)
+        # t2 sits exactly on the updated_at bookmark and t3 on the
+        # last_comment_at bookmark, so both are fetched again.
+        self.assertEqual(client.timeline_requests, ['t2', 't3'])
+
+
+class TestSkipUnchangedChildrenFlag(unittest.TestCase):
+    def test_gate_is_stripped_by_default(self):
+        endpoints = sync._without_parent_replication_keys(ENDPOINTS_CONFIG)
+        self.assertNotIn('parent_replication_keys',
+                         endpoints['threads']['children']['thread_timelines'])
+        # The shared config is not modified
+        self.assertIn('parent_replication_keys',
+                      ENDPOINTS_CONFIG['threads']['children']['thread_timelines'])
+
+    def test_every_thread_is_fetched_without_the_gate(self):
+        state = {'bookmarks': {'thread_timelines': {
+            'updated_at': '2099-01-01T00:00:00Z',
+            'last_comment_at': '2099-01-01T00:00:00Z',
+        }}}
+        endpoint = sync._without_parent_replication_keys({'threads': THREADS_ENDPOINT})
+        client = FakeClient(TestSyncEndpointBookmarks.PAGES)
+        run_sync_endpoint(client, state, endpoint=endpoint['threads'])
+        self.assertEqual(client.timeline_requests, ['t1', 't2', 't3'])